@@ -2,46 +2,71 @@ import time
 
 from pydo import Client
 
+from models import Action, Droplet, SSHKey
+
 
 class DigitalOceanManager:
     def __init__(self, token):
         self.client = Client(token=token)
 
-    def handle_action_response(self, response):
+    def handle_response(self, response, key, model, description):
         """
-        Handle DigitalOcean API call responses for droplet actions.
+        Handle DigitalOcean API call responses that return a single object.
 
         :param response: The API response as a dictionary.
-        :return: The action ID if successful, or raised exception if unsuccessful.
+        :param key: The key the object is under in a successful response (e.g. "droplet").
+        :param model: The model class to parse the object into.
+        :param description: What the call was doing, used in error messages.
+        :return: The parsed object if successful, or raised exception if unsuccessful.
         """
-        if "action" in response:
-            action_id = response["action"]["id"]
-            print(f"Action successful: {response["action"]["type"]}, {response["action"]["status"]}")
-            return action_id
-        
-        if "id" in response:
-            error_message = response["message"]
-            print(f"Error: {error_message}")
-            raise RuntimeError(f"DigitalOcean API Action error: {error_message}")
+        if key in response:
+            return model.from_dict(response[key])
 
-        raise ValueError("Unexpected response format from DigitalOcean API.")
+        self.raise_for_error(response, description)
 
-    def handle_ssh_key_response(self, response):
+    def raise_for_error(self, response, description):
         """
-        Handle DigitalOcean API call responses for SSH Key creation.
+        Raise an exception for a DigitalOcean API error response.
 
         :param response: The API response as a dictionary.
-        :return: The SSH Key if successful, or raised exception if unsuccessful.
+        :param description: What the call was doing, used in error messages.
+        :raises RuntimeError: If the response is a DigitalOcean API error.
+        :raises ValueError: If the response is in an unexpected format.
         """
-        if "ssh_key" in response:
-            ssh_key = response["ssh_key"]
-            print(f"SSH Key {ssh_key["name"]} successfully uploaded to DigitalOcean")
-            return ssh_key
-        
         if "id" in response:
             error_message = response["message"]
             print(f"Error: {error_message}")
-            raise RuntimeError(f"DigitalOcean API SSH Key creation error: {error_message}")
+            raise RuntimeError(f"DigitalOcean API {description} error: {error_message}")
+
+        raise ValueError("Unexpected response format from DigitalOcean API.")
+
+    def iter_pages(self, api_method, key, model, description, per_page=200):
+        """
+        Lazily parse every object from a paginated DigitalOcean API list call.
+
+        Only one page of raw objects is held at a time.
+
+        :param api_method: The list method to call (from pydo.Client).
+        :param key: The key the objects are under in a successful response (e.g. "droplets").
+        :param model: The model class to parse each object into.
+        :param description: What the call was doing, used in error messages.
+        :param per_page: The number of objects to request per page.
+        :return: A generator of parsed objects.
+        """
+        page = 1
+
+        while True:
+            response = self.call_api(api_method, per_page=per_page, page=page)
+            if key not in response:
+                self.raise_for_error(response, description)
+
+            for item in response[key]:
+                yield model.from_dict(item)
+
+            if not response.get("links", {}).get("pages", {}).get("next"):
+                return
+
+            page += 1
 
     def wait_for_action(self, action_id, timeout=300, interval=5):
         """
@@ -60,7 +85,7 @@ class DigitalOceanManager:
                     self.client.actions.get,
                     action_id=action_id
                 )
-                status = response["action"]["status"]
+                status = self.handle_response(response, "action", Action, "Action fetch").status
 
                 if status == "completed":
                     print(f"Action {action_id} completed successfully.")
@@ -91,7 +116,7 @@ class DigitalOceanManager:
                     self.client.droplets.get,
                     droplet_id=id
                 )
-                status = response["droplet"]["status"]
+                status = self.handle_response(response, "droplet", Droplet, "Droplet fetch").status
 
                 if status == "active":
                     print(f"Droplet {id} creation complete.")
@@ -122,24 +147,35 @@ class DigitalOceanManager:
             print(f"An unexpected error occurred while Calling DigitalOcean API: {e}")
             raise
 
-    def power_droplet(self, droplet_id, type):
+    def post_action(self, droplet_id, body):
         """
-        Tries to turn on or power off a droplet.
-        
-        :param droplet_id: The ID of the droplet to be powered on.
-        :param type: The type of action being performed (power_on, shutdown).
-        :return: The action ID of the power operation, or a response indicating the action failed.
+        Start a Droplet action and wait for it to finish.
+
+        :param droplet_id: The ID of the droplet the action is for.
+        :param body: The action request body (e.g. {"type": "power_on"}).
+        :return: The action ID, or raised exception if the action could not be started.
         """
         response = self.call_api(
             self.client.droplet_actions.post,
             droplet_id=droplet_id,
-            body={"type": type}
+            body=body
         )
 
-        action_id = self.handle_action_response(response)
-        self.wait_for_action(action_id)
+        action = self.handle_response(response, "action", Action, "Action")
+        print(f"Action successful: {action.type}, {action.status}")
+        self.wait_for_action(action.id)
+
+        return action.id
 
-        return action_id
+    def power_droplet(self, droplet_id, type):
+        """
+        Tries to turn on or power off a droplet.
+        
+        :param droplet_id: The ID of the droplet to be powered on.
+        :param type: The type of action being performed (power_on, shutdown).
+        :return: The action ID of the power operation, or a response indicating the action failed.
+        """
+        return self.post_action(droplet_id, {"type": type})
 
     def resize_droplet(self, droplet_id, size):
         """
@@ -149,15 +185,7 @@ class DigitalOceanManager:
         :param size: The new size (e.g. "s-2vcpu-2gb).
         :return: The action ID of the resize operation, or a response indicating the action failed.
         """
-        response = self.call_api(
-            self.client.droplet_actions.post,
-            droplet_id=droplet_id,
-            body={"type": "resize", "size": size}
-        )
-        action_id = self.handle_action_response(response)
-        self.wait_for_action(action_id)
-
-        return action_id
+        return self.post_action(droplet_id, {"type": "resize", "size": size})
 
     def resize_with_power_cycle(self, droplet_id, size):
         """
@@ -190,7 +218,7 @@ class DigitalOceanManager:
 
         :param name: Optional, the Droplet name to get.
         :param droplet_id: Optional, the Droplet ID to get.
-        :return: The specified Droplet as a dictionary.
+        :return: The specified Droplet, or False if no Droplet has the given name.
         """
 
         if droplet_id:
@@ -198,58 +226,33 @@ class DigitalOceanManager:
                 self.client.droplets.get,
                 droplet_id=droplet_id
             )
-            if "droplet" in response:
-                droplet = response["droplet"]
-                print(f"Droplet {droplet["name"]} successfully fetched from DigitalOcean")
-                return droplet
-
-            if "id" in response:
-                error_message = response["message"]
-                print(f"Error: {error_message}")
-                raise RuntimeError(f"DigitalOcean API Droplet fetch error: {error_message}")
+            droplet = self.handle_response(response, "droplet", Droplet, "Droplet fetch")
+            print(f"Droplet {droplet.name} successfully fetched from DigitalOcean")
+            return droplet
 
         elif name:
-            response = self.call_api(
-                self.client.droplets.list
-            )
-            if "droplets" in response:
-                droplets = response["droplets"]
-                droplet = [droplet for droplet in droplets if droplet["name"] == name]
+            droplets = self.iter_pages(self.client.droplets.list, "droplets", Droplet, "Droplets fetch")
+            droplet = next((droplet for droplet in droplets if droplet.name == name), None)
 
-                if len(droplet) < 1:
-                    print(f"Droplet {name} could not be found")
-                    return False
+            if droplet is None:
+                print(f"Droplet {name} could not be found")
+                return False
 
-                droplet = droplet[0]
-                print(f"Droplet {droplet["name"]} successfully fetched from DigitalOcean")
-                return droplet
-            
-            if "id" in response:
-                error_message = response["message"]
-                print(f"Error: {error_message}")
-                raise RuntimeError(f"DigitalOcean API Droplets fetch error: {error_message}")
+            print(f"Droplet {droplet.name} successfully fetched from DigitalOcean")
+            return droplet
 
         else:
-            raise Exception(f"'name' or 'key_id' must be specified when calling DigitalOceanManager.get_droplet")
+            raise Exception(f"'name' or 'droplet_id' must be specified when calling DigitalOceanManager.get_droplet")
 
     def get_droplets(self):
         """
         Get all Droplets associated with the DigitalOcean account.
         
-        :return: A list of Droplets as dictionaries.
+        :return: A list of Droplets.
         """
-        response = self.call_api(
-            self.client.droplets.list
-        )
-        if "droplets" in response:
-            droplets = response["droplets"]
-            print(f"{len(droplets)} successfully fetched from DigitalOcean")
-            return droplets
-
-        if "id" in response:
-            error_message = response["message"]
-            print(f"Error: {error_message}")
-            raise RuntimeError(f"DigitalOcean API Droplets fetch error: {error_message}")
+        droplets = list(self.iter_pages(self.client.droplets.list, "droplets", Droplet, "Droplets fetch"))
+        print(f"{len(droplets)} Droplets successfully fetched from DigitalOcean")
+        return droplets
 
     def make_droplet(self, name, region, size, image, root_key_id, cloud_init):
         """
@@ -261,23 +264,16 @@ class DigitalOceanManager:
         :param image: The keyword for the OS Image to install on the new Droplet.
         :param root_key_id: The ID of the Digital Ocean SSH Key to use for the new Droplet's root user.
         :param cloud_init: The cloud-init config as a string.
-        :return: The newly created Droplet as a dictionary.
+        :return: The newly created Droplet.
         """
         response = self.call_api(
             self.client.droplets.create,
             body={"name": name, "region": region, "size": size, "image": image, "ssh_keys": [f"{root_key_id}"], "user_data": cloud_init}
         )
-        if "droplet" in response:
-            droplet = response["droplet"]
-            print(f"Successfully created Droplet {droplet["name"]}")
-            self.wait_for_droplet(droplet["id"])
-            return droplet
-
-        if "id" in response:
-            error_message = response["message"]
-            print(f"Error: {error_message}")
-            raise RuntimeError(f"DigitalOcean API Droplets fetch error: {error_message}")
-
+        droplet = self.handle_response(response, "droplet", Droplet, "Droplet creation")
+        print(f"Successfully created Droplet {droplet.name}")
+        self.wait_for_droplet(droplet.id)
+        return droplet
 
     def get_key(self, key_id=None, name=None):
         """
@@ -285,43 +281,27 @@ class DigitalOceanManager:
         
         :param key_id: Optional, the SSH Key ID to get.
         :param name: Optional, the SSH Key name to get.
-        :return: The specified SSH Key as a dictionary.
+        :return: The specified SSH Key, or False if no SSH Key has the given name.
         """
         if key_id:
             response = self.call_api(
                 self.client.ssh_keys.get,
                 ssh_key_identifier=key_id
             )
-            if "ssh_key" in response:
-                ssh_key = response["ssh_key"]
-                print(f"SSH Key {ssh_key["id"]} successfully fetched from DigitalOcean")
-                return ssh_key
-            
-            if "id" in response:
-                error_message = response["message"]
-                print(f"Error: {error_message}")
-                raise RuntimeError(f"DigitalOcean API SSH Key fetch error: {error_message}")
+            ssh_key = self.handle_response(response, "ssh_key", SSHKey, "SSH Key fetch")
+            print(f"SSH Key {ssh_key.id} successfully fetched from DigitalOcean")
+            return ssh_key
 
         elif name:
-            response = self.call_api(
-                self.client.ssh_keys.list
-            )
-            if "ssh_keys" in response:
-                ssh_keys = response["ssh_keys"]
-                ssh_key = [ssh_key for ssh_key in ssh_keys if ssh_key["name"] == name]
+            ssh_keys = self.iter_pages(self.client.ssh_keys.list, "ssh_keys", SSHKey, "SSH Key fetch")
+            ssh_key = next((ssh_key for ssh_key in ssh_keys if ssh_key.name == name), None)
 
-                if len(ssh_key) < 1:
-                    print(f"SSH Key {name} could not be found")
-                    return False
+            if ssh_key is None:
+                print(f"SSH Key {name} could not be found")
+                return False
 
-                ssh_key = ssh_key[0]
-                print(f"SSH Key {ssh_key["name"]} successfully fetched from DigitalOcean")
-                return ssh_key
-            
-            if "id" in response:
-                error_message = response["message"]
-                print(f"Error: {error_message}")
-                raise RuntimeError(f"DigitalOcean API SSH Key fetch error: {error_message}")
+            print(f"SSH Key {ssh_key.name} successfully fetched from DigitalOcean")
+            return ssh_key
 
         else:
             raise Exception(f"'name' or 'key_id' must be specified when calling DigitalOceanManager.get_key")
@@ -330,20 +310,11 @@ class DigitalOceanManager:
         """
         Get all SSH Keys associated with the DigitalOcean account.
         
-        :return: List of SSH Keys as dictionaries.
+        :return: List of SSH Keys.
         """
-        response = self.call_api(
-            self.client.ssh_keys.list
-        )
-        if "ssh_keys" in response:
-            ssh_keys = response["ssh_keys"]
-            print(f"{len(ssh_keys)} SSH Keys successfully fetched from DigitalOcean")
-            return ssh_keys
-        
-        if "id" in response:
-            error_message = response["message"]
-            print(f"Error: {error_message}")
-            raise RuntimeError(f"DigitalOcean API SSH Key fetch error: {error_message}")
+        ssh_keys = list(self.iter_pages(self.client.ssh_keys.list, "ssh_keys", SSHKey, "SSH Key fetch"))
+        print(f"{len(ssh_keys)} SSH Keys successfully fetched from DigitalOcean")
+        return ssh_keys
 
     def upload_key(self, public_key, key_name):
         """
@@ -351,22 +322,16 @@ class DigitalOceanManager:
 
         :param public_key: The public key to be used for authentication.
         :param key_name: The name of the public key.
-        :return: The SSH Key JSON object as a dictionary.
+        :return: The uploaded SSH Key.
         """
         response = self.call_api(
             self.client.ssh_keys.create,
             body={"public_key": public_key, "name": key_name}
         )
 
-        if "ssh_key" in response:
-            ssh_key = response["ssh_key"]
-            print(f"SSH Key {ssh_key["name"]} successfully uploaded to DigitalOcean")
-            return ssh_key
-        
-        if "id" in response:
-            error_message = response["message"]
-            print(f"Error: {error_message}")
-            raise RuntimeError(f"DigitalOcean API SSH Key creation error: {error_message}")
+        ssh_key = self.handle_response(response, "ssh_key", SSHKey, "SSH Key creation")
+        print(f"SSH Key {ssh_key.name} successfully uploaded to DigitalOcean")
+        return ssh_key
 
     def delete_key(self, key_id):
         """
@@ -383,8 +348,5 @@ class DigitalOceanManager:
         if not response:
             return True
 
-        if "id" in response:
-            error_message = response["message"]
-            print(f"Error: {error_message}")
-            raise RuntimeError(f"DigitalOcean API SSH Key deletion error: {error_message}")
+        self.raise_for_error(response, "SSH Key deletion")
         
\ No newline at end of file
@@ -1,3 +1,4 @@
+import argparse
 import base64
 import hashlib
 import os
@@ -8,8 +9,11 @@ import traceback
 from dotenv import find_dotenv, load_dotenv, set_key, unset_key
 import paramiko
 
-from commands import get_bootstrap_website_command, rebuild_container_command, get_cloud_init, wait_for_cloud_init
+from commands import DEPLOY_SCRIPT, bootstrap_website_steps, deploy_steps, get_cloud_init, get_deploy_env, rebuild_container_steps, update_container_steps, wait_for_cloud_init_steps
 from do_api import DigitalOceanManager
+from remote import run_script
+from sizing import choose_build_size, load_history, record_build, sample_resources
+from watch import RemoteHead, watch
 
 dotenv_path = find_dotenv()
 load_dotenv(dotenv_path)
@@ -24,8 +28,12 @@ SERVER_USERNAME = os.environ.get("SERVER_USERNAME")
 SERVER_PASSWORD = os.environ.get("SERVER_PASSWORD")
 ROOT_PASSWORD = os.environ.get("ROOT_PASSWORD")
 IP_ADDRESS = os.environ.get("IP_ADDRESS")
+GRIDOON_REPO = os.environ.get("GRIDOON_REPO") or "https://github.com/hashtagbowl/Gridoon"
 ROOT_KEY_NAME = "gridoon_root"
 USER_KEY_NAME = "gridoon_user"
+BUILD_DEADLINE = int(os.environ.get("BUILD_DEADLINE") or 900)
+IDLE_SIZE = "s-1vcpu-1gb"
+BUILD_HISTORY_PATH = Path(__file__).parent / "build_history.json"
 
 # Digial Ocean client init
 do_client = DigitalOceanManager(token=DO_TOKEN)
@@ -65,6 +73,8 @@ def connect_with_retry(hostname, username, private_key_path, port=22, retries=10
         try:
             print(f"Attempt {attempt} of {retries} to connect to {hostname}...")
             ssh_client.connect(hostname=hostname, port=port, username=username, pkey=private_key)
+            # Keep idle sessions alive, and notice sooner when one dies
+            ssh_client.get_transport().set_keepalive(30)
             print("Connected successfully!")
             return ssh_client  # Return the connected client
         except (paramiko.ssh_exception.NoValidConnectionsError, paramiko.ssh_exception.SSHException) as e:
@@ -80,12 +90,11 @@ def get_droplet_ip():
 
     droplet = do_client.get_droplet(name="gridoon")
 
-    for ip in droplet["networks"]["v4"]:
-        if ip["type"] == "public":
-            set_key(dotenv_path, "IP_ADDRESS", ip["ip_address"])
-            load_dotenv(dotenv_path, override=True)
-            IP_ADDRESS = os.environ.get("IP_ADDRESS")
-            print(f"Found server IP {IP_ADDRESS}")
+    if droplet.public_ip:
+        set_key(dotenv_path, "IP_ADDRESS", droplet.public_ip)
+        load_dotenv(dotenv_path, override=True)
+        IP_ADDRESS = os.environ.get("IP_ADDRESS")
+        print(f"Found server IP {IP_ADDRESS}")
 
 def generate_keys(key_name):
     script_dir = Path(__file__).parent
@@ -154,10 +163,10 @@ def verify_keys(key_name):
             # If the DigitalOcean key with the given name was found
             public_key, private_key = get_local_keys(key_name)
 
-            if do_key["public_key"] != public_key:
+            if do_key.public_key != public_key:
                 # If DigitalOcean public key doesn't match local public key
                 # Delete the DigitalOcean key and upload the local public key
-                do_client.delete_key(do_key["id"])
+                do_client.delete_key(do_key.id)
                 do_key = do_client.upload_key(public_key, key_name)
 
         return do_key, private_key, public_key
@@ -166,9 +175,14 @@ def verify_keys(key_name):
         print("SSH key verification failed, script is doomed", e)
         traceback.print_exc()
 
-def wait_for_docker(ssh_client, container_name, status, timeout=600):
+def wait_for_docker(ssh_client, container_name, status, timeout=600, samples=None):
     start_time = time.time()
     while time.time() - start_time < timeout:
+        if samples is not None:
+            sample = sample_resources(ssh_client)
+            if sample:
+                samples.append(sample)
+
         stdin, stdout, stderr = ssh_client.exec_command(f"docker inspect --format='{{{{.State.Status}}}}' {container_name}")
         output = stdout.read().decode().strip()
         print(output)
@@ -177,30 +191,119 @@ def wait_for_docker(ssh_client, container_name, status, timeout=600):
             return True
         time.sleep(5)
 
-def send_server_command(commands, ip_address, username, private_key, docker_status=False, containers=None):
-    ssh_client = connect_with_retry(hostname=ip_address, port=22, username=username, private_key_path=private_key)
-    
-    # Send website setup commands
-    stdin, stdout, stderr = ssh_client.exec_command(commands)
-    stdout.channel.recv_exit_status()  # Wait for command to finish
-    output = stdout.read().decode()
-    print(output)
+def is_connected(ssh_client):
+    transport = ssh_client.get_transport() if ssh_client else None
+    return transport is not None and transport.is_active()
+
+def send_server_command(steps, ip_address, username, private_key, env=None, docker_status=False, containers=None, samples=None, sample_interval=5, ssh_client=None):
+    # Reuse a warm session if one was passed in and is still alive
+    keep_open = ssh_client is not None
+    if not is_connected(ssh_client):
+        ssh_client = connect_with_retry(hostname=ip_address, port=22, username=username, private_key_path=private_key)
+
+    def take_sample():
+        sample = sample_resources(ssh_client)
+        if sample:
+            samples.append(sample)
+
+    # Run the deploy steps, sampling server resources over the same connection until they finish
+    exit_status, progress = run_script(
+        ssh_client,
+        DEPLOY_SCRIPT,
+        steps,
+        env=env,
+        while_running=take_sample if samples is not None else None,
+        interval=sample_interval
+    )
+    if exit_status != 0:
+        if not keep_open:
+            ssh_client.close()
+        failed = [report["step"] for report in progress if report["status"] == "failed"]
+        raise RuntimeError(f"Server steps {", ".join(failed) or ", ".join(steps)} failed with exit status {exit_status}")
 
     # Check docker status
     if docker_status == True:
         for container in containers:
-            wait_for_docker(ssh_client, container["name"], container["ready_status"])
+            if not wait_for_docker(ssh_client, container["name"], container["ready_status"], samples=samples):
+                if not keep_open:
+                    ssh_client.close()
+                raise RuntimeError(f"{container["name"]} did not become {container["ready_status"]} in time")
+
+    # Close connection to server, unless the caller wants to keep using it
+    if not keep_open:
+        ssh_client.close()
+
+    return ssh_client
+
+def build_website(droplet_id, steps, user_private_key, ssh_client=None):
+    """
+    Resize the Droplet for the build if needed, run the build, and resize it back.
+    Step sets without a build step run as they are, without resizing or recording history.
+
+    :param droplet_id: The ID of the gridoon Droplet.
+    :param steps: The deploy script steps that build the website.
+    :param user_private_key: Path to the server user's private key.
+    :param ssh_client: Optional, a connected SSH client to reuse. It is kept open if given, but a
+        resize restarts the Droplet, so it only stays usable when the build runs without resizing.
+    :return: The SSH client used for the build.
+    """
+    deploy_env = get_deploy_env(GITHUB_USERNAME, GITHUB_TOKEN, EMAIL, DOMAIN, GRIDOON_REPO)
+
+    if "build" not in steps:
+        print(f"Running {", ".join(steps)}")
+        return send_server_command(steps, IP_ADDRESS, SERVER_USERNAME, user_private_key, env=deploy_env, docker_status="up" in steps, containers=containers, ssh_client=ssh_client)
+
+    # Pick the cheapest size that should meet the build deadline, or None to build without resizing
+    build_size = choose_build_size(load_history(BUILD_HISTORY_PATH), IDLE_SIZE, BUILD_DEADLINE, steps)
+    keep_open = ssh_client is not None
+    build_start = None
+    build_failed = True
 
-    # Close connection to server
-    ssh_client.close()
+    try:
+        if build_size:
+            print(f"Making the Droplet stronger so we can actually make the website ({build_size})")
+            do_client.resize_with_power_cycle(droplet_id, build_size)
 
-def main():
+        # The resize can fail part way through, so record the size the Droplet actually has
+        try:
+            actual_size = do_client.get_droplet(droplet_id=droplet_id).size_slug
+        except Exception as e:
+            print(f"Could not check the Droplet size, assuming {build_size or IDLE_SIZE}: {e}")
+            actual_size = build_size or IDLE_SIZE
+
+        # Connect before timing the build so boot and SSH retries aren't counted
+        if not is_connected(ssh_client):
+            if ssh_client:
+                ssh_client.close()
+            ssh_client = connect_with_retry(hostname=IP_ADDRESS, port=22, username=SERVER_USERNAME, private_key_path=user_private_key)
+
+        print("Building website")
+        samples = []
+        build_start = time.time()
+
+        send_server_command(steps, IP_ADDRESS, SERVER_USERNAME, user_private_key, env=deploy_env, docker_status=True, containers=containers, samples=samples, ssh_client=ssh_client)
+        build_failed = False
+    finally:
+        # Failed builds are recorded too, so a size that can't finish a build isn't picked again
+        if build_start is not None:
+            record_build(BUILD_HISTORY_PATH, actual_size, steps, time.time() - build_start, samples, failed=build_failed)
+
+        if not keep_open and ssh_client:
+            ssh_client.close()
+
+        if build_size:
+            print("Making the Droplet weaker so we don't give digital ocean too much money")
+            do_client.resize_with_power_cycle(droplet_id, IDLE_SIZE)
+
+    return ssh_client
+
+def main(steps=None):
     # Verify user and root SSH keys
     do_root_key, root_private_key, root_public_key = verify_keys(ROOT_KEY_NAME)
     do_user_key, user_private_key, user_public_key = verify_keys(USER_KEY_NAME)
 
-    # Set commands for rebuilding website
-    commands = rebuild_container_command
+    # Set steps for rebuilding website
+    steps = steps or rebuild_container_steps
 
     # Look for a Droplet named gridoon
     gridoon_droplet = do_client.get_droplet(name="gridoon")        
@@ -209,16 +312,16 @@ def main():
         # Put env vars in cloud_init config
         cloud_init = get_cloud_init(SERVER_USERNAME, SERVER_PASSWORD, ROOT_PASSWORD, user_public_key)
         
-        # Set commands for building website
-        commands = get_bootstrap_website_command(GITHUB_USERNAME, GITHUB_TOKEN, EMAIL, DOMAIN)
+        # Set steps for building website
+        steps = bootstrap_website_steps
 
         # Make new Droplet
         gridoon_droplet = do_client.make_droplet(
             name="gridoon",
             region="tor1",
-            size="s-1vcpu-1gb",
+            size=IDLE_SIZE,
             image="ubuntu-24-04-x64",
-            root_key_id=do_root_key["id"],
+            root_key_id=do_root_key.id,
             cloud_init=cloud_init
         )
 
@@ -226,21 +329,84 @@ def main():
 
         print(f"Now would be a good time to update your DNS with the new droplet IP: {IP_ADDRESS}")
         print("Connecting to server to see when the server finishes building")
-        send_server_command(wait_for_cloud_init, IP_ADDRESS, "root", root_private_key)
+        send_server_command(wait_for_cloud_init_steps, IP_ADDRESS, "root", root_private_key)
         print("Server ready")
 
-    droplet_id = gridoon_droplet["id"]
-
-    print("Making the Droplet stronger so we can actually make the website")
-    do_client.resize_with_power_cycle(droplet_id, "s-2vcpu-2gb")
+    droplet_id = gridoon_droplet.id
+    build_website(droplet_id, steps, user_private_key)
 
-    print("Building website")
-    send_server_command(commands, IP_ADDRESS, SERVER_USERNAME, user_private_key, docker_status=True, containers=containers)
-
-    print("Making the Droplet weaker so we don't give digital ocean too much money")
-    do_client.resize_with_power_cycle(droplet_id, "s-1vcpu-1gb")
     print("Website should come up shortly! Please give it at least 5 minutes before running the script again.")
     print("If the website does not come up, make sure you have created the proper DNS records, then run the script again")
 
+def parse_steps(value):
+    # Check step names here so a typo fails before the Droplet is resized
+    steps = [step.strip() for step in value.split(",") if step.strip()]
+    unknown = [step for step in steps if step not in deploy_steps]
+    if not steps or unknown:
+        raise argparse.ArgumentTypeError(f"unknown step(s) {", ".join(unknown) or value!r}, choose from {",".join(deploy_steps)}")
+    return steps
+
+def get_deployed_commit(ssh_client):
+    stdin, stdout, stderr = ssh_client.exec_command("git -C ~/Gridoon rev-parse HEAD")
+    commit = stdout.read().decode().strip()
+    return commit or None
+
+def watch_main(interval, debounce):
+    # Make sure the website exists before watching it
+    if not do_client.get_droplet(name="gridoon"):
+        main()
+
+    # Everything below is looked up once and reused by every deploy
+    do_user_key, user_private_key, user_public_key = verify_keys(USER_KEY_NAME)
+    gridoon_droplet = do_client.get_droplet(name="gridoon")
+    droplet_id = gridoon_droplet.id
+
+    if not IP_ADDRESS:
+        get_droplet_ip()
+
+    ssh_client = connect_with_retry(hostname=IP_ADDRESS, port=22, username=SERVER_USERNAME, private_key_path=user_private_key)
+    if ssh_client is None:
+        print(f"Could not connect to {IP_ADDRESS}, not starting watch mode")
+        return
+
+    deployed_commit = get_deployed_commit(ssh_client)
+    print(f"Server is on {deployed_commit[:7] if deployed_commit else 'an unknown commit'}")
+
+    def deploy(commit):
+        nonlocal ssh_client
+        try:
+            ssh_client = build_website(droplet_id, update_container_steps, user_private_key, ssh_client=ssh_client)
+
+            # The server pulls whatever HEAD is when it builds, so ask it what it ended up on
+            if not is_connected(ssh_client):
+                if ssh_client:
+                    ssh_client.close()
+                ssh_client = connect_with_retry(hostname=IP_ADDRESS, port=22, username=SERVER_USERNAME, private_key_path=user_private_key)
+                if ssh_client is None:
+                    raise RuntimeError(f"Could not reconnect to {IP_ADDRESS} after the deploy")
+            return get_deployed_commit(ssh_client) or commit
+        except Exception as e:
+            print(f"Deploy failed: {e}")
+            traceback.print_exc()
+            return None
+
+    try:
+        watch(RemoteHead(GRIDOON_REPO, GITHUB_USERNAME, GITHUB_TOKEN), deploy, deployed_commit, interval=interval, debounce=debounce)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        if ssh_client:
+            ssh_client.close()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Rebuild the gridoon website, or update it to the latest version.")
+    parser.add_argument("--steps", type=parse_steps, help=f"comma separated deploy steps to run on an existing Droplet (default {",".join(rebuild_container_steps)})")
+    parser.add_argument("--watch", action="store_true", help="keep running and deploy new Gridoon commits as they land")
+    parser.add_argument("--interval", type=int, default=60, help="seconds between checks for new commits in watch mode")
+    parser.add_argument("--debounce", type=int, default=120, help="seconds the latest commit must stay unchanged before deploying in watch mode")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch_main(args.interval, args.debounce)
+    else:
+        main(args.steps)
\ No newline at end of file
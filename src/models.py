@@ -0,0 +1,105 @@
+class Droplet:
+    """
+    The parts of a DigitalOcean Droplet this tool uses.
+    """
+    __slots__ = ("id", "name", "status", "size_slug", "networks_v4")
+
+    def __init__(self, id, name, status, size_slug, networks_v4):
+        self.id = id
+        self.name = name
+        self.status = status
+        self.size_slug = size_slug
+        self.networks_v4 = networks_v4
+
+    @classmethod
+    def from_dict(cls, droplet):
+        """
+        Make a Droplet from a DigitalOcean API droplet object.
+
+        :param droplet: The droplet object as a dictionary.
+        :return: The Droplet.
+        """
+        return cls(
+            id=droplet["id"],
+            name=droplet["name"],
+            status=droplet.get("status"),
+            size_slug=droplet.get("size_slug"),
+            networks_v4=tuple(
+                (network["type"], network["ip_address"])
+                for network in droplet.get("networks", {}).get("v4", [])
+            )
+        )
+
+    @property
+    def public_ip(self):
+        """
+        The Droplet's public IPv4 address, or None if it doesn't have one yet.
+        """
+        for network_type, ip_address in self.networks_v4:
+            if network_type == "public":
+                return ip_address
+
+        return None
+
+    def __repr__(self):
+        return f"Droplet(id={self.id!r}, name={self.name!r}, status={self.status!r})"
+
+
+class SSHKey:
+    """
+    The parts of a DigitalOcean SSH Key this tool uses.
+    """
+    __slots__ = ("id", "name", "public_key", "fingerprint")
+
+    def __init__(self, id, name, public_key, fingerprint):
+        self.id = id
+        self.name = name
+        self.public_key = public_key
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def from_dict(cls, ssh_key):
+        """
+        Make an SSHKey from a DigitalOcean API ssh_key object.
+
+        :param ssh_key: The ssh_key object as a dictionary.
+        :return: The SSHKey.
+        """
+        return cls(
+            id=ssh_key["id"],
+            name=ssh_key["name"],
+            public_key=ssh_key.get("public_key"),
+            fingerprint=ssh_key.get("fingerprint")
+        )
+
+    def __repr__(self):
+        return f"SSHKey(id={self.id!r}, name={self.name!r})"
+
+
+class Action:
+    """
+    The parts of a DigitalOcean Action this tool uses.
+    """
+    __slots__ = ("id", "type", "status")
+
+    def __init__(self, id, type, status):
+        self.id = id
+        self.type = type
+        self.status = status
+
+    @classmethod
+    def from_dict(cls, action):
+        """
+        Make an Action from a DigitalOcean API action object.
+
+        :param action: The action object as a dictionary.
+        :return: The Action.
+        """
+        return cls(
+            id=action["id"],
+            type=action.get("type"),
+            status=action.get("status")
+        )
+
+    def __repr__(self):
+        return f"Action(id={self.id!r}, type={self.type!r}, status={self.status!r})"
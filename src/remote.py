@@ -0,0 +1,151 @@
+import hashlib
+import io
+import json
+import shlex
+import time
+
+
+# Exit status the remote command uses to say the script hasn't been uploaded yet
+SCRIPT_MISSING = 210
+REMOTE_SCRIPT_DIR = ".gridoon"
+PROGRESS_PREFIX = "::progress "
+
+
+def get_script_name(script):
+    """
+    Get the versioned name a script is cached under on the server.
+
+    :param script: The script contents as bytes.
+    :return: The file name, e.g. "deploy-0123456789abcdef.sh".
+    """
+    return f"deploy-{hashlib.sha256(script).hexdigest()[:16]}.sh"
+
+
+def upload_script(ssh_client, script):
+    """
+    Upload a script to the server over SFTP and remove older versions of it.
+
+    :param ssh_client: A connected paramiko SSH client.
+    :param script: The script contents as bytes.
+    """
+    script_name = get_script_name(script)
+    sftp = ssh_client.open_sftp()
+
+    try:
+        if REMOTE_SCRIPT_DIR not in sftp.listdir("."):
+            sftp.mkdir(REMOTE_SCRIPT_DIR, mode=0o700)
+
+        for old_script in sftp.listdir(REMOTE_SCRIPT_DIR):
+            if "deploy-" in old_script and old_script != script_name:
+                sftp.remove(f"{REMOTE_SCRIPT_DIR}/{old_script}")
+
+        # Upload under a temporary name so an interrupted upload is never mistaken for the cached script
+        temp_path = f"{REMOTE_SCRIPT_DIR}/.{script_name}.tmp"
+        sftp.putfo(io.BytesIO(script), temp_path)
+        sftp.chmod(temp_path, 0o700)
+        sftp.posix_rename(temp_path, f"{REMOTE_SCRIPT_DIR}/{script_name}")
+        print(f"Uploaded {script_name} to the server")
+    finally:
+        sftp.close()
+
+
+def handle_output_line(line, progress):
+    """
+    Print a line of script output, collecting it if it is a progress report.
+
+    :param line: The line of output.
+    :param progress: The list progress reports are added to.
+    """
+    if not line.startswith(PROGRESS_PREFIX):
+        print(line)
+        return
+
+    try:
+        report = json.loads(line[len(PROGRESS_PREFIX):])
+    except ValueError:
+        print(line)
+        return
+
+    progress.append(report)
+
+    if report["status"] == "started":
+        print(f"Step {report["step"]} started")
+    else:
+        print(f"Step {report["step"]} {report["status"]} after {report["seconds"]} seconds")
+
+
+def exec_script(ssh_client, script_name, steps, env, while_running=None, interval=5):
+    """
+    Run steps of an already uploaded script in one exec, streaming its output.
+
+    :param ssh_client: A connected paramiko SSH client.
+    :param script_name: The versioned script name from get_script_name.
+    :param steps: The names of the steps to run, in order.
+    :param env: Settings for the script as a dictionary. Sent over stdin, not the command line.
+    :param while_running: Optional, called every interval seconds while the script runs.
+    :param interval: The time in seconds between while_running calls.
+    :return: The exit status and the list of progress reports.
+    """
+    remote_path = f"$HOME/{REMOTE_SCRIPT_DIR}/{script_name}"
+    command = f'[ -f "{remote_path}" ] || exit {SCRIPT_MISSING}; bash "{remote_path}" {shlex.join(steps)}'
+
+    channel = ssh_client.get_transport().open_session()
+    channel.set_combine_stderr(True)
+    channel.exec_command(command)
+
+    settings = "".join(f"{key}={value}\n" for key, value in (env or {}).items() if value is not None)
+    channel.sendall(f"{settings}\n".encode())
+    channel.shutdown_write()
+
+    progress = []
+    buffer = b""
+    last_call = 0
+
+    while True:
+        while channel.recv_ready():
+            buffer += channel.recv(32768)
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                handle_output_line(line.decode(errors="replace"), progress)
+
+        if channel.exit_status_ready() and not channel.recv_ready():
+            break
+
+        if while_running and time.time() - last_call >= interval:
+            while_running()
+            last_call = time.time()
+
+        time.sleep(0.5)
+
+    if buffer:
+        handle_output_line(buffer.decode(errors="replace"), progress)
+
+    exit_status = channel.recv_exit_status()
+    channel.close()
+
+    return exit_status, progress
+
+
+def run_script(ssh_client, script_path, steps, env=None, while_running=None, interval=5):
+    """
+    Run steps of a local script on the server, uploading it first only if the server
+    doesn't already have this version.
+
+    :param ssh_client: A connected paramiko SSH client.
+    :param script_path: Path to the local script.
+    :param steps: The names of the steps to run, in order.
+    :param env: Optional, settings for the script as a dictionary.
+    :param while_running: Optional, called every interval seconds while the script runs.
+    :param interval: The time in seconds between while_running calls.
+    :return: The exit status and the list of progress reports.
+    """
+    script = script_path.read_bytes().replace(b"\r\n", b"\n")
+    script_name = get_script_name(script)
+
+    exit_status, progress = exec_script(ssh_client, script_name, steps, env, while_running, interval)
+
+    if exit_status == SCRIPT_MISSING and not progress:
+        upload_script(ssh_client, script)
+        exit_status, progress = exec_script(ssh_client, script_name, steps, env, while_running, interval)
+
+    return exit_status, progress
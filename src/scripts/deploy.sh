@@ -0,0 +1,87 @@
+#!/usr/bin/env bash
+# Gridoon deploy steps. Uploaded to the server once and cached by content hash.
+#
+# Usage: deploy.sh STEP [STEP...]
+# Settings are read from stdin as KEY=value lines, ending at the first blank line,
+# so secrets never appear on a command line.
+# Each step prints "::progress {json}" lines when it starts and finishes.
+
+while IFS= read -r line && [ -n "$line" ]; do
+    export "$line"
+done
+
+progress() {
+    printf '::progress {"step": "%s", "status": "%s", "seconds": %d, "exit_status": %d}\n' "$1" "$2" "$3" "$4"
+}
+
+step_wait_cloud_init() {
+    # cloud-init exits non-zero for recoverable errors, which shouldn't stop a deploy
+    cloud-init status --wait || true
+}
+
+step_credentials() {
+    # Enable persistent github credentials
+    git config --global credential.helper store
+    # Setup git credentials
+    (umask 077 && printf 'https://%s:%s@github.com\n' "$GITHUB_USERNAME" "$GITHUB_TOKEN" > ~/.git-credentials)
+    chmod 600 ~/.git-credentials
+}
+
+step_clone() {
+    # Clone website repo
+    if [ -d ~/Gridoon/.git ]; then
+        echo "~/Gridoon already cloned"
+    else
+        git clone "$REPO_URL" ~/Gridoon
+    fi
+}
+
+step_configure() {
+    # Make nginx-certbot.env
+    cp ~/Gridoon/nginx-certbot.example.env ~/Gridoon/nginx-certbot.env
+    sed -i "s/your@email.org/$EMAIL/g" ~/Gridoon/nginx-certbot.env
+    # Add domain name to nginx.conf
+    sed -i "s/gridoon.com/$DOMAIN/g" ~/Gridoon/user_conf.d/nginx.conf
+    sed -i "s/www.gridoon.com/www.$DOMAIN/g" ~/Gridoon/user_conf.d/nginx.conf
+}
+
+step_pull() {
+    git -C ~/Gridoon pull
+}
+
+step_clean() {
+    # Best effort, anything already gone is fine
+    docker compose -f ~/Gridoon/docker-compose.yml -p gridoon-website down --volumes --remove-orphans || true
+    docker rm -f gridoon-nginx-certbot gridoon-nodejs || true
+    docker image prune -f || true
+    docker image rm -f gridoon-website-nodejs jonasal/nginx-certbot || true
+    docker volume rm -f gridoon-website_gridoon_data gridoon-website_nginx_secrets || true
+}
+
+step_build() {
+    docker compose -f ~/Gridoon/docker-compose.yml -p gridoon-website up -d --no-deps --build nodejs
+}
+
+step_up() {
+    # Build and up the container
+    docker compose -f ~/Gridoon/docker-compose.yml -p gridoon-website up -d
+}
+
+for step in "$@"; do
+    if ! declare -F "step_$step" > /dev/null; then
+        echo "Unknown step: $step"
+        progress "$step" failed 0 64
+        exit 64
+    fi
+
+    start=$(date +%s)
+    progress "$step" started 0 0
+    (set -e; "step_$step")
+    status=$?
+
+    if [ "$status" -ne 0 ]; then
+        progress "$step" failed $(($(date +%s) - start)) "$status"
+        exit "$status"
+    fi
+    progress "$step" done $(($(date +%s) - start)) 0
+done
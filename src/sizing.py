@@ -0,0 +1,293 @@
+import json
+import statistics
+import time
+
+
+# Droplet sizes we are willing to build on, smallest first
+SIZES = [
+    {
+        "slug": "s-1vcpu-1gb",
+        "vcpus": 1,
+        "memory_mb": 1024
+    },
+    {
+        "slug": "s-1vcpu-2gb",
+        "vcpus": 1,
+        "memory_mb": 2048
+    },
+    {
+        "slug": "s-2vcpu-2gb",
+        "vcpus": 2,
+        "memory_mb": 2048
+    },
+    {
+        "slug": "s-2vcpu-4gb",
+        "vcpus": 2,
+        "memory_mb": 4096
+    },
+    {
+        "slug": "s-4vcpu-8gb",
+        "vcpus": 4,
+        "memory_mb": 8192
+    }
+]
+
+# Size to build on when the history can't tell us anything better
+DEFAULT_BUILD_SIZE = "s-2vcpu-2gb"
+
+# How many recent builds per size are considered when picking a size
+HISTORY_WINDOW = 5
+
+sample_resources_command = "head -n 1 /proc/loadavg && grep -E '^(MemTotal|MemAvailable|SwapTotal|SwapFree):' /proc/meminfo"
+
+
+def get_size(slug):
+    """
+    Get a size from the SIZES ladder by slug.
+
+    :param slug: The size keyword (e.g. "s-2vcpu-2gb").
+    :return: The size as a dictionary, or None if the slug isn't on the ladder.
+    """
+    for size in SIZES:
+        if size["slug"] == slug:
+            return size
+
+    return None
+
+
+def sample_resources(ssh_client):
+    """
+    Take one CPU, memory and swap reading from the server.
+
+    :param ssh_client: A connected paramiko SSH client.
+    :return: The sample as a dictionary, or None if the reading failed.
+    """
+    try:
+        stdin, stdout, stderr = ssh_client.exec_command(sample_resources_command)
+        lines = stdout.read().decode().strip().splitlines()
+
+        load = float(lines[0].split()[0])
+        meminfo = {}
+        for line in lines[1:]:
+            key, value = line.split(":")
+            meminfo[key] = int(value.split()[0]) // 1024
+
+        return {
+            "time": time.time(),
+            "load": load,
+            "mem_used_mb": meminfo["MemTotal"] - meminfo["MemAvailable"],
+            "swap_used_mb": meminfo["SwapTotal"] - meminfo["SwapFree"]
+        }
+    except Exception as e:
+        print(f"Could not sample server resources: {e}")
+        return None
+
+
+def summarize_samples(samples):
+    """
+    Reduce a list of resource samples to their peaks.
+
+    :param samples: A list of samples from sample_resources.
+    :return: The peak load, memory and swap as a dictionary, or None if there are no samples.
+    """
+    if not samples:
+        return None
+
+    return {
+        "peak_load": max(sample["load"] for sample in samples),
+        "peak_mem_used_mb": max(sample["mem_used_mb"] for sample in samples),
+        "peak_swap_used_mb": max(sample["swap_used_mb"] for sample in samples)
+    }
+
+
+def get_history_key(slug, steps):
+    """
+    Get the key a build is recorded under. Builds are kept apart per step set, so quick
+    partial or incremental runs never stand in for full builds.
+
+    :param slug: The size keyword.
+    :param steps: The deploy steps the build ran.
+    :return: The key, e.g. "s-2vcpu-2gb:pull,clean,build,up".
+    """
+    return f"{slug}:{",".join(steps)}"
+
+
+def get_step_history(history, steps):
+    """
+    Get the builds that ran a given step set, keyed by size.
+
+    :param history: The build history as loaded by load_history.
+    :param steps: The deploy steps.
+    :return: A dictionary mapping size slugs to lists of build records.
+    """
+    suffix = f":{",".join(steps)}"
+    return {key[:-len(suffix)]: builds for key, builds in history.items() if key.endswith(suffix)}
+
+
+def load_history(history_path):
+    """
+    Load the local build history.
+
+    :param history_path: Path to the build history JSON file.
+    :return: A dictionary mapping history keys (see get_history_key) to lists of build records.
+    """
+    if not history_path.exists():
+        return {}
+
+    try:
+        with open(history_path, "r") as history_file:
+            return json.load(history_file)
+    except (OSError, ValueError) as e:
+        print(f"Build history {history_path} could not be read, starting fresh: {e}")
+        return {}
+
+
+def record_build(history_path, size, steps, duration, samples, failed=False):
+    """
+    Add a build to the local build history.
+
+    :param history_path: Path to the build history JSON file.
+    :param size: The size keyword the build ran on.
+    :param steps: The deploy steps the build ran.
+    :param duration: The build time in seconds.
+    :param samples: The resource samples taken during the build.
+    :param failed: Whether the build failed or timed out.
+    :return: The updated history as a dictionary.
+    """
+    history = load_history(history_path)
+
+    record = {"time": time.time(), "duration": duration}
+    if failed:
+        record["failed"] = True
+    peaks = summarize_samples(samples)
+    if peaks:
+        record.update(peaks)
+
+    key = get_history_key(size, steps)
+    builds = history.setdefault(key, [])
+    builds.append(record)
+    history[key] = builds[-HISTORY_WINDOW:]
+
+    with open(history_path, "w") as history_file:
+        json.dump(history, history_file, indent=4)
+
+    print(f"Build on {size} {"failed after" if failed else "took"} {duration:.0f} seconds")
+    return history
+
+
+def last_build_failed(history, slug):
+    """
+    Check if the most recent build on a size failed.
+
+    :param history: The build history for one step set (see get_step_history).
+    :param slug: The size keyword.
+    :return: True if the size's latest build failed, False otherwise.
+    """
+    builds = history.get(slug)
+    return bool(builds) and builds[-1].get("failed", False)
+
+
+def expected_duration(history, slug):
+    """
+    Get the expected build time for a size from its recent successful builds.
+
+    :param history: The build history for one step set (see get_step_history).
+    :param slug: The size keyword.
+    :return: The median build time in seconds, or None if no build on the size has succeeded.
+    """
+    durations = [build["duration"] for build in history.get(slug, []) if not build.get("failed")]
+    if not durations:
+        return None
+
+    return statistics.median(durations)
+
+
+def fits_in_memory(history, size, headroom):
+    """
+    Check if recorded builds would have fit in a size's memory without swapping.
+
+    :param history: The build history for one step set (see get_step_history).
+    :param size: The size as a dictionary.
+    :param headroom: The fraction of the size's memory the builds must stay under.
+    :return: True if every sampled build would have fit, False if not or if there are no samples.
+    """
+    peaks = [
+        build["peak_mem_used_mb"] + build["peak_swap_used_mb"]
+        for builds in history.values()
+        for build in builds
+        if "peak_mem_used_mb" in build
+    ]
+    if not peaks:
+        return False
+
+    return max(peaks) < size["memory_mb"] * headroom
+
+
+def choose_build_size(history, idle_size, deadline, steps, headroom=0.8):
+    """
+    Pick the cheapest size that should finish a build within the deadline.
+
+    Sizes with history are judged by their median successful build time, and a size
+    whose latest build failed is skipped. A size with no history yet is tried once every
+    recorded build would have fit comfortably in its memory.
+
+    :param history: The build history as loaded by load_history.
+    :param idle_size: The size keyword the Droplet runs at between builds.
+    :param deadline: The build time target in seconds.
+    :param steps: The deploy steps about to run. Only builds of the same step set are considered.
+    :param headroom: The fraction of the deadline and of memory a size must stay under to be tried untested or used without resizing.
+    :return: The size keyword to build on, or None if the build should run at the idle size.
+    """
+    history = get_step_history(history, steps)
+    idle = get_size(idle_size)
+    if not last_build_failed(history, idle_size):
+        idle_duration = expected_duration(history, idle_size)
+        if idle_duration is not None and idle_duration <= deadline * headroom:
+            print(f"Builds on {idle_size} take about {idle_duration:.0f} seconds, skipping the resize")
+            return None
+
+        if idle is not None and idle_size not in history and fits_in_memory(history, idle, headroom):
+            print(f"Recent builds fit comfortably in {idle_size}, trying the build without resizing")
+            return None
+
+    candidates = [
+        size for size in SIZES
+        if size["slug"] != idle_size and (idle is None or size["memory_mb"] >= idle["memory_mb"])
+    ]
+    known = []
+
+    for size in candidates:
+        if last_build_failed(history, size["slug"]):
+            continue
+
+        duration = expected_duration(history, size["slug"])
+        if duration is None:
+            if size["slug"] not in history and fits_in_memory(history, size, headroom):
+                print(f"No builds on {size["slug"]} yet, trying it")
+                return size["slug"]
+            continue
+
+        if duration <= deadline:
+            print(f"Builds on {size["slug"]} take about {duration:.0f} seconds, within the {deadline} second target")
+            return size["slug"]
+
+        known.append((duration, size["slug"]))
+
+    if known:
+        duration, slug = min(known)
+        print(f"No size is known to meet the {deadline} second target, using the fastest known size {slug} (about {duration:.0f} seconds)")
+        return slug
+
+    if not history:
+        print(f"No build history yet, using {DEFAULT_BUILD_SIZE}")
+        return DEFAULT_BUILD_SIZE
+
+    # Only failures so far, so step up past the largest size that failed
+    failed = [index for index, size in enumerate(SIZES) if last_build_failed(history, size["slug"])]
+    for size in SIZES[max(failed, default=-1) + 1:]:
+        if size in candidates:
+            print(f"Builds on smaller sizes failed, trying {size["slug"]}")
+            return size["slug"]
+
+    print(f"Builds failed on every size, using the largest size {SIZES[-1]["slug"]}")
+    return SIZES[-1]["slug"]
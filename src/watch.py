@@ -0,0 +1,184 @@
+import base64
+import os
+import re
+import subprocess
+import time
+import urllib.error
+import urllib.request
+
+
+GITHUB_REPO_URL = re.compile(r"^https://github\.com/([^/]+)/([^/]+?)(?:\.git)?/?$")
+
+
+def get_git_env(github_username=None, github_token=None):
+    """
+    Build the environment for local git calls, with GitHub credentials passed as a header
+    so the token never shows up in the command line or the repository URL.
+
+    :param github_username: Optional, the GitHub username.
+    :param github_token: Optional, the GitHub token.
+    :return: The environment as a dictionary.
+    """
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+
+    if github_username and github_token:
+        credentials = base64.b64encode(f"{github_username}:{github_token}".encode()).decode()
+        env["GIT_CONFIG_COUNT"] = "1"
+        env["GIT_CONFIG_KEY_0"] = "http.https://github.com/.extraHeader"
+        env["GIT_CONFIG_VALUE_0"] = f"Authorization: Basic {credentials}"
+
+    return env
+
+
+def get_remote_head(repo_url, env=None, timeout=30):
+    """
+    Get the commit the remote repository's HEAD points at without fetching anything.
+
+    :param repo_url: The URL or path of the repository.
+    :param env: Optional, the environment for the git call (see get_git_env).
+    :param timeout: The maximum time in seconds to wait for the remote.
+    :return: The commit hash as a string, or None if the remote could not be reached.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "ls-remote", repo_url, "HEAD"],
+            capture_output=True,
+            text=True,
+            env=env,
+            timeout=timeout
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Could not check {repo_url} for new commits: {e}")
+        return None
+
+    if result.returncode != 0:
+        print(f"Could not check {repo_url} for new commits: {result.stderr.strip()}")
+        return None
+
+    for line in result.stdout.splitlines():
+        commit, ref = line.split()
+        if ref == "HEAD":
+            return commit
+
+    return None
+
+
+class RemoteHead:
+    """
+    Tracks the commit a repository's HEAD points at.
+
+    GitHub repositories are checked with a conditional API request, so an unchanged HEAD
+    costs a 304 with no body that doesn't count against the rate limit. Anything else,
+    such as a local bare repository, is checked with git ls-remote.
+    """
+
+    def __init__(self, repo_url, github_username=None, github_token=None):
+        self.repo_url = repo_url
+        self.github_token = github_token
+        self.env = get_git_env(github_username, github_token)
+        self.etag = None
+        self.commit = None
+
+        match = GITHUB_REPO_URL.match(repo_url)
+        self.api_url = f"https://api.github.com/repos/{match[1]}/{match[2]}/commits/HEAD" if match else None
+
+    def get(self):
+        """
+        Get the commit the remote HEAD points at.
+
+        :return: The commit hash as a string, or None if the remote could not be reached.
+        """
+        if self.api_url is None:
+            return get_remote_head(self.repo_url, self.env)
+
+        return self.get_github_head()
+
+    def get_github_head(self, timeout=30):
+        """
+        Ask the GitHub API for the HEAD commit, only downloading it if it changed since the last check.
+
+        :param timeout: The maximum time in seconds to wait for GitHub.
+        :return: The commit hash as a string, or None if GitHub and git ls-remote both failed.
+        """
+        request = urllib.request.Request(self.api_url, headers={
+            "Accept": "application/vnd.github.sha",
+            "User-Agent": "manage_gridoon"
+        })
+        if self.github_token:
+            request.add_header("Authorization", f"Bearer {self.github_token}")
+        if self.etag and self.commit:
+            request.add_header("If-None-Match", self.etag)
+
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                self.commit = response.read().decode().strip()
+                self.etag = response.headers.get("ETag")
+                return self.commit
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return self.commit
+            print(f"GitHub API check failed ({e.code}), falling back to git ls-remote")
+        except (urllib.error.URLError, OSError) as e:
+            print(f"GitHub API check failed ({e}), falling back to git ls-remote")
+
+        return get_remote_head(self.repo_url, self.env)
+
+
+def wait_for_quiet(remote, commit, debounce=120, max_wait=900):
+    """
+    Wait until the remote HEAD stops moving so a burst of commits is deployed once.
+
+    :param remote: The RemoteHead being watched.
+    :param commit: The newest commit seen so far.
+    :param debounce: The time in seconds HEAD must stay on one commit.
+    :param max_wait: The maximum time in seconds to wait before deploying anyway.
+    :return: The commit to deploy.
+    """
+    start_time = time.time()
+
+    while time.time() - start_time < max_wait:
+        time.sleep(debounce)
+        latest = remote.get()
+
+        if latest is None or latest == commit:
+            return commit
+
+        print(f"More commits arrived ({latest[:7]}), waiting for them to settle")
+        commit = latest
+
+    print(f"Commits are still arriving after {max_wait} seconds, deploying {commit[:7]}")
+    return commit
+
+
+def watch(remote, deploy, deployed_commit=None, interval=60, debounce=120):
+    """
+    Poll a repository and deploy whenever its HEAD moves. Runs until interrupted.
+
+    A commit that fails to deploy is not retried, the next deploy waits for a new HEAD.
+
+    :param remote: The RemoteHead to watch.
+    :param deploy: Called with the commit to deploy, returns the commit the server ended up on, or None if the deploy failed.
+    :param deployed_commit: Optional, the commit that is currently live.
+    :param interval: The time in seconds between checks.
+    :param debounce: The time in seconds HEAD must stay on one commit before deploying.
+    """
+    print(f"Watching {remote.repo_url} for new commits every {interval} seconds")
+    failed_commit = None
+
+    while True:
+        commit = remote.get()
+
+        if commit and commit not in (deployed_commit, failed_commit):
+            print(f"New commit {commit[:7]} found")
+            commit = wait_for_quiet(remote, commit, debounce=debounce)
+            live_commit = deploy(commit)
+
+            if live_commit:
+                deployed_commit = live_commit
+                failed_commit = None
+                print(f"Deployed {live_commit[:7]}")
+            else:
+                failed_commit = commit
+                print(f"Deploying {commit[:7]} failed, waiting for a new commit before trying again")
+
+        time.sleep(interval)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The tool runs as plain scripts from src/, so import its modules the same way
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
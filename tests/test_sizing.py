@@ -0,0 +1,88 @@
+from sizing import DEFAULT_BUILD_SIZE, choose_build_size, expected_duration, get_history_key, load_history, record_build
+
+IDLE_SIZE = "s-1vcpu-1gb"
+FULL_STEPS = ["pull", "clean", "build", "up"]
+UPDATE_STEPS = ["pull", "build", "up"]
+
+
+def build(duration, mem=None, failed=False):
+    record = {"duration": duration}
+    if mem is not None:
+        record.update({"peak_mem_used_mb": mem, "peak_swap_used_mb": 0})
+    if failed:
+        record["failed"] = True
+    return record
+
+
+def choose(history, steps=FULL_STEPS):
+    # Tests write histories keyed by size, as if every build ran the same steps
+    keyed = {get_history_key(slug, steps): builds for slug, builds in history.items()}
+    return choose_build_size(keyed, IDLE_SIZE, 900, steps)
+
+
+def test_no_history_uses_default_size():
+    assert choose({}) == DEFAULT_BUILD_SIZE
+
+
+def test_fast_idle_builds_skip_the_resize():
+    history = {IDLE_SIZE: [build(300)]}
+    assert choose(history) is None
+
+
+def test_picks_cheapest_size_meeting_the_deadline():
+    history = {
+        IDLE_SIZE: [build(2000)],
+        "s-1vcpu-2gb": [build(1200)],
+        "s-2vcpu-2gb": [build(600)],
+        "s-2vcpu-4gb": [build(400)]
+    }
+    assert choose(history) == "s-2vcpu-2gb"
+
+
+def test_untested_idle_size_is_tried_when_builds_fit_in_memory():
+    history = {"s-2vcpu-2gb": [build(400, mem=700)]}
+    assert choose(history) is None
+
+
+def test_failed_idle_build_is_not_retried():
+    history = {
+        "s-2vcpu-2gb": [build(400, mem=700)],
+        IDLE_SIZE: [build(600, mem=1000, failed=True)]
+    }
+    assert choose(history) == "s-1vcpu-2gb"
+
+
+def test_failed_builds_do_not_count_toward_duration():
+    history = {"s-2vcpu-2gb": [build(100, failed=True), build(500)]}
+    assert expected_duration(history, "s-2vcpu-2gb") == 500
+
+
+def test_falls_back_to_fastest_known_size():
+    history = {
+        "s-2vcpu-2gb": [build(2000)],
+        "s-4vcpu-8gb": [build(1000)]
+    }
+    assert choose(history) == "s-4vcpu-8gb"
+
+
+def test_steps_up_past_failed_sizes():
+    history = {"s-2vcpu-2gb": [build(900, failed=True)]}
+    assert choose(history) == "s-2vcpu-4gb"
+
+
+def test_other_step_sets_are_ignored():
+    # Quick incremental builds on the idle size must not make full builds skip the resize
+    history = {get_history_key(IDLE_SIZE, UPDATE_STEPS): [build(60)]}
+    assert choose_build_size(history, IDLE_SIZE, 900, FULL_STEPS) == DEFAULT_BUILD_SIZE
+    assert choose_build_size(history, IDLE_SIZE, 900, UPDATE_STEPS) is None
+
+
+def test_record_build_keeps_failures(tmp_path):
+    history_path = tmp_path / "build_history.json"
+    record_build(history_path, "s-2vcpu-2gb", FULL_STEPS, 120, [], failed=True)
+    record_build(history_path, "s-2vcpu-2gb", FULL_STEPS, 300, [{"load": 1.5, "mem_used_mb": 800, "swap_used_mb": 0}])
+
+    builds = load_history(history_path)["s-2vcpu-2gb:pull,clean,build,up"]
+    assert builds[0]["failed"] is True
+    assert "failed" not in builds[1]
+    assert builds[1]["peak_mem_used_mb"] == 800
@@ -0,0 +1,162 @@
+import io
+import subprocess
+import urllib.error
+
+import pytest
+
+import watch
+from watch import RemoteHead, get_remote_head, wait_for_quiet
+
+
+class StopWatching(Exception):
+    pass
+
+
+def git(*args, cwd=None):
+    result = subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """
+    A bare repository standing in for GitHub, and a clone to push commits from.
+    """
+    bare = tmp_path / "Gridoon.git"
+    work = tmp_path / "work"
+    git("init", "--bare", str(bare))
+    git("clone", str(bare), str(work))
+
+    def push_commit():
+        git("commit", "--allow-empty", "-m", "change", cwd=work)
+        git("push", "origin", "HEAD", cwd=work)
+        return git("rev-parse", "HEAD", cwd=work)
+
+    return str(bare), push_commit
+
+
+real_sleep = watch.time.sleep
+
+
+def stop_after(sleeps, count):
+    """
+    Replace time.sleep so watch() stops after a number of its own zero-second sleeps.
+    subprocess also sleeps briefly while waiting on git, those calls pass straight through.
+    """
+    def sleep(seconds):
+        if seconds:
+            return real_sleep(seconds)
+        sleeps.append(seconds)
+        if len(sleeps) >= count:
+            raise StopWatching()
+    return sleep
+
+
+def test_get_remote_head(repo):
+    bare, push_commit = repo
+    commit = push_commit()
+
+    assert get_remote_head(bare) == commit
+    assert RemoteHead(bare).get() == commit
+
+
+def test_get_remote_head_unreachable(tmp_path):
+    assert get_remote_head(str(tmp_path / "missing.git")) is None
+
+
+def test_wait_for_quiet_follows_a_burst(repo, monkeypatch):
+    bare, push_commit = repo
+    first = push_commit()
+    pushed = []
+
+    def sleep(seconds):
+        if seconds:
+            return real_sleep(seconds)
+        # One more commit lands during the first debounce window
+        if not pushed:
+            pushed.append(push_commit())
+
+    monkeypatch.setattr(watch.time, "sleep", sleep)
+
+    assert wait_for_quiet(RemoteHead(bare), first, debounce=0) == pushed[0]
+
+
+def test_watch_deploys_new_commits_once(repo, monkeypatch):
+    bare, push_commit = repo
+    old = push_commit()
+    new = push_commit()
+    deployed = []
+
+    def deploy(commit):
+        deployed.append(commit)
+        return commit
+
+    sleeps = []
+    monkeypatch.setattr(watch.time, "sleep", stop_after(sleeps, 4))
+
+    with pytest.raises(StopWatching):
+        watch.watch(RemoteHead(bare), deploy, deployed_commit=old, interval=0, debounce=0)
+
+    assert deployed == [new]
+
+
+def test_watch_skips_the_live_commit(repo, monkeypatch):
+    bare, push_commit = repo
+    live = push_commit()
+    deployed = []
+
+    monkeypatch.setattr(watch.time, "sleep", stop_after([], 3))
+
+    with pytest.raises(StopWatching):
+        watch.watch(RemoteHead(bare), deployed.append, deployed_commit=live, interval=0, debounce=0)
+
+    assert deployed == []
+
+
+def test_watch_does_not_retry_a_failed_commit(repo, monkeypatch):
+    bare, push_commit = repo
+    broken = push_commit()
+    attempts = []
+
+    def deploy(commit):
+        attempts.append(commit)
+        return None
+
+    monkeypatch.setattr(watch.time, "sleep", stop_after([], 5))
+
+    with pytest.raises(StopWatching):
+        watch.watch(RemoteHead(bare), deploy, interval=0, debounce=0)
+
+    assert attempts == [broken]
+
+
+class FakeResponse(io.BytesIO):
+    def __init__(self, body, etag):
+        super().__init__(body)
+        self.headers = {"ETag": etag}
+
+
+def test_github_checks_are_conditional(monkeypatch):
+    requests = []
+
+    def urlopen(request, timeout):
+        requests.append(request)
+        if len(requests) == 1:
+            return FakeResponse(b"abc123\n", '"etag-1"')
+        raise urllib.error.HTTPError(request.full_url, 304, "Not Modified", {}, None)
+
+    monkeypatch.setattr(watch.urllib.request, "urlopen", urlopen)
+    remote = RemoteHead("https://github.com/hashtagbowl/Gridoon", "user", "token")
+
+    assert remote.get() == "abc123"
+    assert remote.get() == "abc123"
+    assert requests[0].full_url == "https://api.github.com/repos/hashtagbowl/Gridoon/commits/HEAD"
+    assert requests[0].get_header("If-none-match") is None
+    assert requests[1].get_header("If-none-match") == '"etag-1"'
+    assert requests[1].get_header("Authorization") == "Bearer token"